@@ -6,20 +6,16 @@ It's designed to be beginner-friendly with extensive comments and error handling
 """
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
 import os
 
 from airflow import DAG
-from airflow.operators.python import PythonOperator
-from airflow.operators.bash import BashOperator
-from airflow.models import Variable
-
-# Import our custom functions
-from scripts.stock_data_fetcher import (
-    fetch_stock_data,
-    process_and_store_data,
-    validate_database_connection
-)
+from airflow.decorators import task
+
+# Note: our custom functions in scripts.stock_data_fetcher are imported inside
+# the tasks below. The scheduler re-parses this file every few seconds, and
+# deferring the import keeps psycopg2, pandas and requests out of that parse.
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -49,17 +45,19 @@ dag = DAG(
 # List of stock symbols to fetch (you can modify this list)
 STOCK_SYMBOLS = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA']
 
+# Environment variables the pipeline needs to run
+REQUIRED_ENV_VARS = ('ALPHA_VANTAGE_API_KEY',)
+
+@task
+@lru_cache(maxsize=1)
 def check_environment_variables():
     """
     Check if all required environment variables are set.
     This is a good practice for data pipelines.
-    """
-    required_vars = ['ALPHA_VANTAGE_API_KEY']
-    missing_vars = []
     
-    for var in required_vars:
-        if not os.getenv(var):
-            missing_vars.append(var)
+    The result is cached, so the check only runs once per process.
+    """
+    missing_vars = [var for var in REQUIRED_ENV_VARS if not os.getenv(var)]
     
     if missing_vars:
         raise ValueError(f"Missing required environment variables: {missing_vars}")
@@ -67,6 +65,7 @@ def check_environment_variables():
     logger.info("All required environment variables are set")
     return True
 
+@task
 def log_pipeline_start():
     """
     Log the start of the pipeline execution.
@@ -75,6 +74,7 @@ def log_pipeline_start():
     logger.info(f"Fetching data for symbols: {STOCK_SYMBOLS}")
     return "Pipeline started successfully"
 
+@task
 def log_pipeline_end():
     """
     Log the successful completion of the pipeline.
@@ -82,68 +82,58 @@ def log_pipeline_end():
     logger.info("Stock Market Data Pipeline completed successfully")
     return "Pipeline completed successfully"
 
-# Task 1: Check environment variables
-check_env_task = PythonOperator(
-    task_id='check_environment_variables',
-    python_callable=check_environment_variables,
-    dag=dag,
-)
+@task(task_id='validate_database_connection')
+def validate_database():
+    """
+    Validate the database connection and the stock_prices table.
+    """
+    from scripts.stock_data_fetcher import validate_database_connection
+    return validate_database_connection()
 
-# Task 2: Log pipeline start
-log_start_task = PythonOperator(
-    task_id='log_pipeline_start',
-    python_callable=log_pipeline_start,
-    dag=dag,
-)
+# The task id must match FETCH_TASK_ID in scripts/stock_data_fetcher.py,
+# which is where downstream tasks pull each symbol's data from
+@task(task_id='fetch_all_stock_data')
+def fetch_all(symbols, **context):
+    """
+    Fetch data for all stock symbols in parallel (shared via XCom).
+    """
+    from scripts.stock_data_fetcher import fetch_all_stock_data
+    return fetch_all_stock_data(symbols, **context)
 
-# Task 3: Validate database connection
-validate_db_task = PythonOperator(
-    task_id='validate_database_connection',
-    python_callable=validate_database_connection,
-    dag=dag,
-)
+@task(task_id='bulk_store')
+def bulk_store(symbols, **context):
+    """
+    Store the data for all symbols in one transaction.
+    """
+    from scripts.stock_data_fetcher import bulk_store_all
+    return bulk_store_all(symbols, **context)
 
-# Task 4: Create tasks for each stock symbol
-fetch_tasks = []
-process_tasks = []
-
-for symbol in STOCK_SYMBOLS:
-    # Fetch data task for each symbol
-    fetch_task = PythonOperator(
-        task_id=f'fetch_data_{symbol}',
-        python_callable=fetch_stock_data,
-        op_args=[symbol],  # Pass symbol as argument
-        dag=dag,
-    )
-    fetch_tasks.append(fetch_task)
+with dag:
+    # Task 1: Check environment variables
+    check_env_task = check_environment_variables()
     
-    # Process and store data task for each symbol
-    process_task = PythonOperator(
-        task_id=f'process_and_store_{symbol}',
-        python_callable=process_and_store_data,
-        op_args=[symbol],  # Pass symbol as argument
-        dag=dag,
-    )
-    process_tasks.append(process_task)
+    # Task 2: Log pipeline start
+    log_start_task = log_pipeline_start()
     
-    # Set dependency: fetch before process for each symbol
-    fetch_task >> process_task
-
-# Task 5: Log pipeline completion
-log_end_task = PythonOperator(
-    task_id='log_pipeline_end',
-    python_callable=log_pipeline_end,
-    dag=dag,
-)
-
-# Define task dependencies
-# Start tasks
-check_env_task >> log_start_task >> validate_db_task
-
-# Connect validation to all fetch tasks
-for fetch_task in fetch_tasks:
-    validate_db_task >> fetch_task
-
-# Connect all process tasks to the end task
-for process_task in process_tasks:
-    process_task >> log_end_task
\ No newline at end of file
+    # Task 3: Validate database connection
+    validate_db_task = validate_database()
+    
+    # Task 4: Fetch data for all stock symbols in parallel
+    fetch_task = fetch_all(STOCK_SYMBOLS)
+    
+    # Task 5: Store the data for all symbols in one transaction
+    bulk_store_task = bulk_store(STOCK_SYMBOLS)
+    
+    # Task 6: Log pipeline completion
+    log_end_task = log_pipeline_end()
+    
+    # Define task dependencies in a single chain:
+    # checks first, then fetch all symbols and store them together
+    (
+        check_env_task
+        >> log_start_task
+        >> validate_db_task
+        >> fetch_task
+        >> bulk_store_task
+        >> log_end_task
+    )
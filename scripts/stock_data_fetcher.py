@@ -7,33 +7,132 @@ with extensive error handling and logging.
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import base64
+import io
+import orjson
 import logging
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional
-import psycopg2
+import struct
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from airflow.providers.postgres.hooks.postgres import PostgresHook
 import time
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Database configuration
-DB_CONFIG = {
-    'host': 'postgres',
-    'database': 'stock_data',
-    'user': 'airflow',
-    'password': 'airflow123',
-    'port': 5432
-}
+# Airflow connection holding the stock database credentials
+# (defined by AIRFLOW_CONN_POSTGRES_DEFAULT in docker-compose.yml)
+POSTGRES_CONN_ID = 'postgres_default'
+
+# Columns written for each stock price record
+STOCK_PRICE_COLUMNS = 'symbol, timestamp, open_price, high_price, low_price, close_price, volume'
+
+# Shared upsert clause: refresh prices when a (symbol, timestamp) already exists
+UPSERT_CONFLICT_CLAUSE = """
+    ON CONFLICT (symbol, timestamp) 
+    DO UPDATE SET
+        open_price = EXCLUDED.open_price,
+        high_price = EXCLUDED.high_price,
+        low_price = EXCLUDED.low_price,
+        close_price = EXCLUDED.close_price,
+        volume = EXCLUDED.volume,
+        created_at = CURRENT_TIMESTAMP
+"""
+
+# Batches larger than this are staged with COPY; smaller ones use a multi-row INSERT
+COPY_THRESHOLD_ROWS = 1000
+
+# Binary COPY framing (see the PostgreSQL COPY docs, "Binary Format"):
+# a fixed header, one (length, value) pair per column after the symbol,
+# and a -1 field count as trailer. Timestamps are microseconds since 2000-01-01.
+COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+COPY_BINARY_ROW = struct.Struct('!iqididididiq')
+COPY_BINARY_TRAILER = struct.pack('!h', -1)
+POSTGRES_EPOCH = datetime(2000, 1, 1)
+
+# Layout of the Parquet file used to pass rows between tasks
+PARQUET_SCHEMA = pa.schema([
+    ('symbol', pa.string()),
+    ('timestamp', pa.timestamp('us')),
+    ('open_price', pa.float64()),
+    ('high_price', pa.float64()),
+    ('low_price', pa.float64()),
+    ('close_price', pa.float64()),
+    ('volume', pa.int64())
+])
 
 # Alpha Vantage API configuration
 ALPHA_VANTAGE_BASE_URL = "https://www.alphavantage.co/query"
 
+# Fields of each Alpha Vantage time series entry, in stock_prices column order
+TIME_SERIES_FIELDS = ['1. open', '2. high', '3. low', '4. close', '5. volume']
+
+# Number of hourly data points generated when demo data is used
+DEMO_DATA_POINTS = 5
+
+# Alpha Vantage free tier allows 5 requests per minute
+API_REQUESTS_PER_MINUTE = 5
+
+# Airflow task that fetches all symbols (its XComs are keyed by symbol)
+FETCH_TASK_ID = 'fetch_all_stock_data'
+
+def _get_database_config() -> Dict[str, Any]:
+    """
+    Read the database credentials from the Airflow connection.
+    
+    Returns:
+        Dict[str, Any]: Keyword arguments for psycopg2.connect
+    """
+    connection = PostgresHook(postgres_conn_id=POSTGRES_CONN_ID).get_connection(POSTGRES_CONN_ID)
+    
+    return {
+        'host': connection.host,
+        'database': connection.schema,
+        'user': connection.login,
+        'password': connection.password,
+        'port': connection.port or 5432
+    }
+
+# Connection pool shared by every caller in this process (created on first use)
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _get_connection_pool() -> ThreadedConnectionPool:
+    """
+    Return the module-level connection pool, creating it on first use.
+    
+    The pool is created lazily so that importing this module (for example
+    while Airflow parses the DAG file) never opens a database connection.
+    
+    Returns:
+        ThreadedConnectionPool: Shared connection pool
+    """
+    global _POOL
+    
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadedConnectionPool(minconn=1, maxconn=8, **_get_database_config())
+            logger.info("Database connection pool created")
+        return _POOL
+
 def get_database_connection():
     """
-    Create and return a database connection.
+    Get a database connection from the connection pool.
+    
+    Connections are reused between calls, so each caller must hand the
+    connection back with release_database_connection() instead of closing it.
     
     Returns:
         psycopg2.connection: Database connection object
@@ -42,13 +141,25 @@ def get_database_connection():
         Exception: If connection fails
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = _get_connection_pool().getconn()
         logger.info("Database connection established")
         return conn
     except Exception as e:
         logger.error(f"Failed to connect to database: {str(e)}")
         raise
 
+def release_database_connection(conn):
+    """
+    Return a connection obtained from get_database_connection() to the pool.
+    
+    Args:
+        conn (psycopg2.connection): Database connection object
+    """
+    try:
+        _get_connection_pool().putconn(conn)
+    except Exception as e:
+        logger.warning(f"Failed to return connection to pool: {str(e)}")
+
 def validate_database_connection():
     """
     Validate that we can connect to the database and that the required table exists.
@@ -79,7 +190,6 @@ def validate_database_connection():
             raise Exception("Required table 'stock_prices' not found")
         
         cursor.close()
-        conn.close()
         
         logger.info("Database validation passed")
         return True
@@ -87,6 +197,72 @@ def validate_database_connection():
     except Exception as e:
         logger.error(f"Database validation failed: {str(e)}")
         raise
+    
+    finally:
+        # Return the connection to the pool
+        if 'conn' in locals():
+            release_database_connection(conn)
+
+class _TokenBucket:
+    """
+    Thread-safe token bucket used to stay under the API rate limit.
+    
+    The bucket holds up to `capacity` tokens and refills continuously at
+    `capacity` tokens per `period` seconds. Each request takes one token,
+    waiting for the bucket to refill when it is empty.
+    """
+    
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.refill_rate = capacity / period
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """
+        Take one token, sleeping until one is available.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait_seconds = (1 - self.tokens) / self.refill_rate
+            
+            time.sleep(wait_seconds)
+
+# Rate limiter shared by every fetch in this process
+_RATE_LIMITER = _TokenBucket(capacity=API_REQUESTS_PER_MINUTE, period=60)
+
+# HTTP session shared by every fetch in this process. It keeps connections
+# to the API open between requests and retries rate-limit and server errors
+# with exponential backoff (honouring any Retry-After header).
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+@lru_cache(maxsize=1)
+def _api_key() -> Optional[str]:
+    """
+    Read the Alpha Vantage API key from the environment (cached after the first call).
+    
+    Returns:
+        Optional[str]: The API key, or None if it is missing or still the placeholder
+    """
+    api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
+    
+    if not api_key or api_key == 'your_api_key_here':
+        return None
+    return api_key
 
 def fetch_stock_data(symbol: str) -> Dict[str, Any]:
     """
@@ -96,15 +272,13 @@ def fetch_stock_data(symbol: str) -> Dict[str, Any]:
         symbol (str): Stock symbol (e.g., 'AAPL', 'GOOGL')
         
     Returns:
-        Dict[str, Any]: Raw API response data
+        Dict[str, Any]: Database rows ('rows') and response metadata ('meta')
         
     Raises:
         Exception: If API request fails or data is invalid
     """
     # Get API key from environment variable
-    api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
-    
-    if not api_key or api_key == 'your_api_key_here':
+    if (api_key := _api_key()) is None:
         logger.warning(f"No valid API key found for {symbol}. Using demo data.")
         return _get_demo_data(symbol)
     
@@ -118,10 +292,13 @@ def fetch_stock_data(symbol: str) -> Dict[str, Any]:
     }
     
     try:
+        # Wait for a free slot so the API never answers with a rate-limit note
+        _RATE_LIMITER.acquire()
+        
         logger.info(f"Fetching data for {symbol} from Alpha Vantage API...")
         
         # Make API request with timeout
-        response = requests.get(
+        response = _SESSION.get(
             ALPHA_VANTAGE_BASE_URL, 
             params=params, 
             timeout=30
@@ -130,8 +307,8 @@ def fetch_stock_data(symbol: str) -> Dict[str, Any]:
         # Check if request was successful
         response.raise_for_status()
         
-        # Parse JSON response
-        data = response.json()
+        # Parse JSON response (orjson works on the raw bytes and is faster than json)
+        data = orjson.loads(response.content)
         
         # Check for API errors
         if 'Error Message' in data:
@@ -149,7 +326,12 @@ def fetch_stock_data(symbol: str) -> Dict[str, Any]:
             return _get_demo_data(symbol)
         
         logger.info(f"Successfully fetched data for {symbol}")
-        return data
+        
+        # Convert the response into database rows once, right at the API boundary
+        return {
+            'rows': _parse_time_series(symbol, data),
+            'meta': data.get('Meta Data', {})
+        }
         
     except requests.exceptions.RequestException as e:
         logger.error(f"Network error fetching data for {symbol}: {str(e)}")
@@ -161,19 +343,84 @@ def fetch_stock_data(symbol: str) -> Dict[str, Any]:
         logger.info(f"Using demo data for {symbol} as fallback")
         return _get_demo_data(symbol)
 
-def _get_demo_data(symbol: str) -> Dict[str, Any]:
+def fetch_all_stock_data(symbols: List[str], **context) -> Dict[str, Any]:
+    """
+    Fetch stock data for several symbols in parallel.
+    
+    The requests are I/O bound, so they run in a thread pool and share the
+    module-level HTTP session (and therefore its open TLS connections). Inside Airflow
+    each symbol's data is pushed to XCom under the symbol as key.
+    
+    Args:
+        symbols (List[str]): Stock symbols to fetch
+        **context: Airflow task context
+        
+    Returns:
+        Dict[str, Any]: Fetched data per symbol when run outside Airflow,
+        otherwise the list of fetched symbols
+    """
+    logger.info(f"Fetching data for symbols: {symbols}")
+    
+    with ThreadPoolExecutor(max_workers=len(symbols)) as executor:
+        results = list(executor.map(fetch_stock_data, symbols))
+    
+    data_by_symbol = dict(zip(symbols, results))
+    
+    ti = context.get('ti')
+    if ti is None:
+        return data_by_symbol
+    
+    # Share each symbol's data with downstream tasks, with the rows
+    # packed as compact Parquet instead of a JSON list of lists
+    for symbol, raw_data in data_by_symbol.items():
+        ti.xcom_push(key=symbol, value={
+            'rows_parquet': _rows_to_parquet(raw_data['rows']),
+            'meta': raw_data['meta']
+        })
+    
+    return symbols
+
+def _get_demo_data(symbol: str, num_points: int = DEMO_DATA_POINTS) -> Dict[str, Any]:
     """
     Generate demo data for testing purposes when API is not available.
     
     Args:
         symbol (str): Stock symbol
+        num_points (int): Number of hourly data points to generate
         
     Returns:
-        Dict[str, Any]: Demo data in Alpha Vantage format
+        Dict[str, Any]: Demo rows ('rows') and metadata ('meta'), in the
+        same shape as fetch_stock_data
     """
-    import random
-    from datetime import datetime, timedelta
+    demo_data = {
+        'rows': _get_demo_rows(symbol, num_points),
+        'meta': {
+            '1. Information': 'Intraday (60min) open, high, low, close prices and volume',
+            '2. Symbol': symbol,
+            '3. Last Refreshed': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            '4. Interval': '60min',
+            '5. Output Size': 'Compact',
+            '6. Time Zone': 'US/Eastern'
+        }
+    }
     
+    logger.info(f"Generated demo data for {symbol}")
+    return demo_data
+
+def _get_demo_rows(symbol: str, num_points: int = DEMO_DATA_POINTS) -> List[tuple]:
+    """
+    Generate demo rows directly in the stock_prices column layout.
+    
+    Skipping the Alpha Vantage format means the values never have to be
+    formatted as strings and parsed back again.
+    
+    Args:
+        symbol (str): Stock symbol
+        num_points (int): Number of hourly data points to generate
+        
+    Returns:
+        List[tuple]: Tuples of (symbol, timestamp, open, high, low, close, volume)
+    """
     # Base prices for different stocks
     base_prices = {
         'AAPL': 150.0,
@@ -185,48 +432,261 @@ def _get_demo_data(symbol: str) -> Dict[str, Any]:
     
     base_price = base_prices.get(symbol, 100.0)
     
-    # Generate demo time series data
-    demo_data = {
-        'Meta Data': {
-            '1. Information': 'Intraday (60min) open, high, low, close prices and volume',
-            '2. Symbol': symbol,
-            '3. Last Refreshed': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            '4. Interval': '60min',
-            '5. Output Size': 'Compact',
-            '6. Time Zone': 'US/Eastern'
-        },
-        'Time Series (60min)': {}
-    }
+    # Hourly timestamps for the last num_points hours, newest first
+    timestamps = pd.date_range(
+        end=datetime.now().replace(minute=0, second=0, microsecond=0),
+        periods=num_points,
+        freq=pd.Timedelta(hours=1)
+    )[::-1]
     
-    # Generate 5 data points for the last 5 hours
-    for i in range(5):
-        timestamp = (datetime.now() - timedelta(hours=i)).strftime('%Y-%m-%d %H:00:00')
-        
-        # Generate realistic price variations
-        variation = random.uniform(-0.05, 0.05)  # ±5% variation
-        open_price = base_price * (1 + variation)
-        high_price = open_price * (1 + random.uniform(0, 0.02))  # Up to 2% higher
-        low_price = open_price * (1 - random.uniform(0, 0.02))   # Up to 2% lower
-        close_price = random.uniform(low_price, high_price)
-        volume = random.randint(100000, 1000000)
-        
-        demo_data['Time Series (60min)'][timestamp] = {
-            '1. open': f'{open_price:.2f}',
-            '2. high': f'{high_price:.2f}',
-            '3. low': f'{low_price:.2f}',
-            '4. close': f'{close_price:.2f}',
-            '5. volume': str(volume)
-        }
+    # Generate realistic price variations, one array per column
+    rng = np.random.default_rng()
+    variation = rng.uniform(-0.05, 0.05, num_points)  # ±5% variation
+    open_prices = base_price * (1 + variation)
+    high_prices = open_prices * (1 + rng.uniform(0, 0.02, num_points))  # Up to 2% higher
+    low_prices = open_prices * (1 - rng.uniform(0, 0.02, num_points))   # Up to 2% lower
+    close_prices = rng.uniform(low_prices, high_prices)
+    volumes = rng.integers(100000, 1000000, num_points, endpoint=True)
     
-    logger.info(f"Generated demo data for {symbol}")
-    return demo_data
+    return list(zip(
+        [symbol] * num_points,
+        timestamps.to_pydatetime(),
+        open_prices.round(2).tolist(),
+        high_prices.round(2).tolist(),
+        low_prices.round(2).tolist(),
+        close_prices.round(2).tolist(),
+        volumes.tolist()
+    ))
+
+def _parse_time_series(symbol: str, raw_data: Dict[str, Any]) -> List[tuple]:
+    """
+    Convert an Alpha Vantage response into rows for the stock_prices table.
+    
+    Args:
+        symbol (str): Stock symbol
+        raw_data (Dict[str, Any]): Raw API response data
+        
+    Returns:
+        List[tuple]: Tuples of (symbol, timestamp, open, high, low, close, volume)
+        
+    Raises:
+        Exception: If the response has no time series data
+    """
+    # Extract time series data
+    time_series_key = 'Time Series (60min)'
+    if time_series_key not in raw_data:
+        raise Exception(f"No time series data found for {symbol}")
+    
+    time_series = raw_data[time_series_key]
+    
+    # Load the whole series into a DataFrame (one row per timestamp)
+    # so parsing runs as vectorized pandas operations instead of per value
+    df = pd.DataFrame.from_dict(time_series, orient='index').reindex(columns=TIME_SERIES_FIELDS)
+    df = df.apply(pd.to_numeric, errors='coerce')
+    timestamps = pd.to_datetime(df.index, format='%Y-%m-%d %H:%M:%S', errors='coerce', cache=True)
+    
+    # Skip data points with a missing or unparseable value
+    valid = df.notna().all(axis=1).to_numpy() & timestamps.notna()
+    for timestamp in df.index[~valid]:
+        logger.warning(f"Skipping invalid data point for {symbol} at {timestamp}")
+    
+    df = df[valid]
+    timestamps = timestamps[valid]
+    
+    return list(zip(
+        [symbol] * len(df),
+        timestamps.to_pydatetime(),
+        df['1. open'].tolist(),
+        df['2. high'].tolist(),
+        df['3. low'].tolist(),
+        df['4. close'].tolist(),
+        df['5. volume'].astype('int64').tolist()
+    ))
+
+def _upsert_rows(cursor, rows):
+    """
+    Insert or update a batch of rows in stock_prices.
+    
+    Small batches are sent as one multi-row INSERT, which needs a single
+    round-trip. Large batches are staged with COPY, where the extra temp
+    table statements are outweighed by the faster transfer. Because neither
+    path sends one statement per row, pipelining statements (psycopg 3
+    pipeline mode) would not save any further round-trips.
+    
+    Args:
+        cursor: Open database cursor (the caller owns the transaction)
+        rows (list): Tuples of (symbol, timestamp, open, high, low, close, volume)
+        
+    Returns:
+        int: Number of records inserted or updated
+    """
+    if not rows:
+        return 0
+    
+    if len(rows) > COPY_THRESHOLD_ROWS:
+        return _copy_and_upsert_rows(cursor, rows)
+    
+    # Render every row with mogrify (which handles quoting and escaping)
+    # and join them into one VALUES list, so the batch is a single statement
+    values = b','.join(cursor.mogrify("(%s, %s, %s, %s, %s, %s, %s)", row) for row in rows)
+    
+    cursor.execute(
+        f"INSERT INTO stock_prices ({STOCK_PRICE_COLUMNS}) VALUES ".encode()
+        + values
+        + f"{UPSERT_CONFLICT_CLAUSE};".encode()
+    )
+    
+    return cursor.rowcount
+
+def _copy_and_upsert_rows(cursor, rows):
+    """
+    Stage rows in a temp table with binary COPY and upsert them into stock_prices.
+    
+    COPY streams every row in a single protocol exchange, so the whole batch
+    costs a handful of round-trips instead of one per row. The binary format
+    sends numbers and timestamps as-is, so the server does not have to parse
+    them from text.
+    
+    Args:
+        cursor: Open database cursor (the caller owns the transaction)
+        rows (list): Tuples of (symbol, timestamp, open, high, low, close, volume)
+        
+    Returns:
+        int: Number of records inserted or updated
+    """
+    if not rows:
+        return 0
+    
+    # Encode the rows in PostgreSQL's binary COPY format: a header, then per
+    # row a field count followed by (length, value) pairs, then a trailer
+    buffer = io.BytesIO()
+    buffer.write(COPY_BINARY_HEADER)
+    
+    for symbol, timestamp, open_price, high_price, low_price, close_price, volume in rows:
+        symbol_bytes = symbol.encode()
+        buffer.write(struct.pack(f'!hi{len(symbol_bytes)}s', 7, len(symbol_bytes), symbol_bytes))
+        buffer.write(COPY_BINARY_ROW.pack(
+            8, (timestamp - POSTGRES_EPOCH) // timedelta(microseconds=1),
+            8, open_price,
+            8, high_price,
+            8, low_price,
+            8, close_price,
+            8, volume
+        ))
+    
+    buffer.write(COPY_BINARY_TRAILER)
+    buffer.seek(0)
+    
+    # The temp table disappears automatically when the transaction commits.
+    # Its column types match the binary encoding above; prices are cast to
+    # DECIMAL when they are inserted into stock_prices.
+    cursor.execute("""
+        CREATE TEMP TABLE tmp_stock_prices (
+            symbol TEXT,
+            timestamp TIMESTAMP,
+            open_price DOUBLE PRECISION,
+            high_price DOUBLE PRECISION,
+            low_price DOUBLE PRECISION,
+            close_price DOUBLE PRECISION,
+            volume BIGINT
+        ) ON COMMIT DROP;
+    """)
+    
+    cursor.copy_expert(
+        f"COPY tmp_stock_prices ({STOCK_PRICE_COLUMNS}) FROM STDIN WITH (FORMAT BINARY)",
+        buffer
+    )
+    
+    # Insert or update every staged record using ON CONFLICT
+    cursor.execute(f"""
+        INSERT INTO stock_prices ({STOCK_PRICE_COLUMNS})
+        SELECT {STOCK_PRICE_COLUMNS} FROM tmp_stock_prices
+        {UPSERT_CONFLICT_CLAUSE};
+    """)
+    
+    return cursor.rowcount
+
+def _rows_to_parquet(rows: List[tuple]) -> str:
+    """
+    Encode rows as a Parquet file for passing through XCom.
+    
+    Parquet's dictionary and delta encodings make the payload several times
+    smaller than JSON, and the timestamps keep their exact (naive) values.
+    XCom only stores JSON, so the file is base64 encoded.
+    
+    Args:
+        rows (List[tuple]): Tuples of (symbol, timestamp, open, high, low, close, volume)
+        
+    Returns:
+        str: Base64-encoded Parquet file
+    """
+    columns = list(zip(*rows)) if rows else [[] for _ in PARQUET_SCHEMA]
+    table = pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, PARQUET_SCHEMA)],
+        schema=PARQUET_SCHEMA
+    )
+    
+    # Skip the statistics and embedded Arrow schema (nothing reads them),
+    # and delta-encode the steadily increasing timestamps and volumes
+    buffer = io.BytesIO()
+    pq.write_table(
+        table,
+        buffer,
+        compression='zstd',
+        use_dictionary=['symbol'],
+        column_encoding={'timestamp': 'DELTA_BINARY_PACKED', 'volume': 'DELTA_BINARY_PACKED'},
+        write_statistics=False,
+        store_schema=False
+    )
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+def _rows_from_parquet(payload: str) -> List[tuple]:
+    """
+    Decode rows encoded by _rows_to_parquet.
+    
+    Args:
+        payload (str): Base64-encoded Parquet file
+        
+    Returns:
+        List[tuple]: Tuples of (symbol, timestamp, open, high, low, close, volume)
+    """
+    table = pq.read_table(io.BytesIO(base64.b64decode(payload)))
+    return list(zip(*(column.to_pylist() for column in table.columns)))
+
+def _pull_fetched_data(ti, symbol: str) -> Dict[str, Any]:
+    """
+    Get the data fetched for a symbol by the fetch task from XCom.
+    
+    Args:
+        ti: Airflow task instance
+        symbol (str): Stock symbol
+        
+    Returns:
+        Dict[str, Any]: Database rows ('rows') and response metadata ('meta')
+        
+    Raises:
+        Exception: If the fetch task produced no data
+    """
+    xcom_data = ti.xcom_pull(task_ids=FETCH_TASK_ID, key=symbol)
+    if xcom_data is None:
+        raise Exception(f"No fetched data found for {symbol}")
+    
+    return {
+        'rows': _rows_from_parquet(xcom_data['rows_parquet']),
+        'meta': xcom_data['meta']
+    }
 
-def process_and_store_data(symbol: str):
+def process_and_store_data(symbol: str, **context):
     """
     Process the fetched stock data and store it in PostgreSQL database.
     
+    Inside Airflow the data is read from the fetch task's XCom, so the API
+    is only called once per symbol. When run outside Airflow
+    (for example from the command line) the data is fetched directly.
+    
     Args:
         symbol (str): Stock symbol
+        **context: Airflow task context
         
     Raises:
         Exception: If processing or storage fails
@@ -234,77 +694,33 @@ def process_and_store_data(symbol: str):
     try:
         logger.info(f"Processing and storing data for {symbol}...")
         
-        # Fetch the data (this will get fresh data or use demo data)
-        raw_data = fetch_stock_data(symbol)
-        
-        # Extract time series data
-        time_series_key = 'Time Series (60min)'
-        if time_series_key not in raw_data:
-            raise Exception(f"No time series data found for {symbol}")
+        # Reuse the upstream fetch result when running in Airflow
+        ti = context.get('ti')
+        if ti is not None:
+            raw_data = _pull_fetched_data(ti, symbol)
+        else:
+            # Fetch the data (this will get fresh data or use demo data)
+            raw_data = fetch_stock_data(symbol)
         
-        time_series = raw_data[time_series_key]
+        # The fetched data is already in database row format
+        rows = raw_data['rows']
         
         # Connect to database
         conn = get_database_connection()
         cursor = conn.cursor()
         
-        # Process each timestamp in the time series
-        records_inserted = 0
-        records_updated = 0
-        
-        for timestamp, values in time_series.items():
-            try:
-                # Parse the data
-                parsed_data = {
-                    'symbol': symbol,
-                    'timestamp': datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S'),
-                    'open_price': float(values['1. open']),
-                    'high_price': float(values['2. high']),
-                    'low_price': float(values['3. low']),
-                    'close_price': float(values['4. close']),
-                    'volume': int(values['5. volume'])
-                }
-                
-                # Insert or update record using ON CONFLICT
-                insert_query = """
-                    INSERT INTO stock_prices 
-                    (symbol, timestamp, open_price, high_price, low_price, close_price, volume)
-                    VALUES (%(symbol)s, %(timestamp)s, %(open_price)s, %(high_price)s, 
-                           %(low_price)s, %(close_price)s, %(volume)s)
-                    ON CONFLICT (symbol, timestamp) 
-                    DO UPDATE SET
-                        open_price = EXCLUDED.open_price,
-                        high_price = EXCLUDED.high_price,
-                        low_price = EXCLUDED.low_price,
-                        close_price = EXCLUDED.close_price,
-                        volume = EXCLUDED.volume,
-                        created_at = CURRENT_TIMESTAMP
-                    RETURNING (xmax = 0) AS inserted;
-                """
-                
-                cursor.execute(insert_query, parsed_data)
-                result = cursor.fetchone()
-                
-                if result[0]:  # New record inserted
-                    records_inserted += 1
-                else:  # Existing record updated
-                    records_updated += 1
-                
-            except (ValueError, KeyError) as e:
-                logger.warning(f"Skipping invalid data point for {symbol} at {timestamp}: {str(e)}")
-                continue
+        # Insert or update all rows as one batch
+        records_processed = _upsert_rows(cursor, rows)
         
         # Commit the transaction
         conn.commit()
         cursor.close()
-        conn.close()
         
-        logger.info(f"Successfully processed {symbol}: {records_inserted} new records, {records_updated} updated records")
+        logger.info(f"Successfully processed {symbol}: {len(rows)} rows, {records_processed} records stored")
         
         return {
             'symbol': symbol,
-            'records_inserted': records_inserted,
-            'records_updated': records_updated,
+            'records_processed': records_processed,
             'status': 'success'
         }
         
@@ -315,11 +731,75 @@ def process_and_store_data(symbol: str):
         try:
             if 'conn' in locals():
                 conn.rollback()
-                conn.close()
         except:
             pass
         
         raise
+    
+    finally:
+        # Return the connection to the pool
+        if 'conn' in locals():
+            release_database_connection(conn)
+
+def bulk_store_all(symbols: List[str], **context):
+    """
+    Store the fetched data for every symbol in a single database transaction.
+    
+    The data comes from the upstream fetch task via XCom, so all symbols
+    share one connection, one upsert and one commit.
+    
+    Args:
+        symbols (List[str]): Stock symbols to store
+        **context: Airflow task context
+        
+    Raises:
+        Exception: If processing or storage fails
+    """
+    try:
+        logger.info(f"Bulk storing data for symbols: {symbols}")
+        
+        ti = context['ti']
+        rows = []
+        
+        for symbol in symbols:
+            raw_data = _pull_fetched_data(ti, symbol)
+            rows.extend(raw_data['rows'])
+        
+        # Connect to database
+        conn = get_database_connection()
+        cursor = conn.cursor()
+        
+        # Insert or update all symbols as one batch
+        records_processed = _upsert_rows(cursor, rows)
+        
+        # Commit the transaction
+        conn.commit()
+        cursor.close()
+        
+        logger.info(f"Successfully stored {len(symbols)} symbols: {len(rows)} rows, {records_processed} records stored")
+        
+        return {
+            'symbols': symbols,
+            'records_processed': records_processed,
+            'status': 'success'
+        }
+        
+    except Exception as e:
+        logger.error(f"Error bulk storing data: {str(e)}")
+        
+        # Rollback transaction if connection exists
+        try:
+            if 'conn' in locals():
+                conn.rollback()
+        except:
+            pass
+        
+        raise
+    
+    finally:
+        # Return the connection to the pool
+        if 'conn' in locals():
+            release_database_connection(conn)
 
 def get_latest_data_summary():
     """
@@ -348,7 +828,6 @@ def get_latest_data_summary():
         results = cursor.fetchall()
         
         cursor.close()
-        conn.close()
         
         summary = {
             'total_symbols': len(results),
@@ -361,6 +840,11 @@ def get_latest_data_summary():
     except Exception as e:
         logger.error(f"Error getting data summary: {str(e)}")
         return {'error': str(e)}
+    
+    finally:
+        # Return the connection to the pool
+        if 'conn' in locals():
+            release_database_connection(conn)
 
 # Utility function for manual testing
 if __name__ == "__main__":